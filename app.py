@@ -1,12 +1,21 @@
 import os
-import json
 import re
 import uuid
-from pydub import AudioSegment
-from num2words import num2words
+import hashlib
+import itertools
+import functools
+import contextlib
+import struct
+import queue
+import time
+from concurrent.futures import Future
+import threading
+from collections import deque, OrderedDict
+import numpy as np
+import orjson
+import ahocorasick
+import soundfile as sf
 from datetime import datetime
-from gtts import gTTS
-from TTS.api import TTS 
 from flask import (
     Flask,
     render_template,
@@ -17,9 +26,11 @@ from flask import (
     Response,
     jsonify,
 )
+from flask.json.provider import JSONProvider
 from dotenv import load_dotenv
 import random 
 from groq import Groq
+import httpx
 from signalwire.rest import Client as SignalWireClient
 from signalwire.voice_response import VoiceResponse, Gather
 
@@ -35,15 +46,136 @@ print("DEBUG USE_COQUI_TTS =", USE_COQUI_TTS)
 
 BN_MODEL_NAME = "tts_models/bn/custom/vits-female"
 
+# Run Coqui on the GPU when there is one (FP16 autocast there)
+TTS_DEVICE = "cpu"
+
+# "torch" (eager PyTorch) or "onnx" (export VITS once, run it in ONNX Runtime;
+# graph-level fusion makes CPU inference noticeably faster). The ONNX backend
+# always runs on CPU: requirements.txt installs the CPU onnxruntime, so use
+# "torch" on GPU hosts.
+TTS_BACKEND = os.getenv("TTS_BACKEND", "torch").lower()
+TTS_ONNX_PATH = os.getenv("TTS_ONNX_PATH", "vits_bn.onnx")
+
+# CPU only: dynamic int8 quantization of the model (TTS_INT8=true in .env).
+# With TTS_BACKEND=onnx the exported graph is quantized, convolutions
+# included; the torch backend can only quantize nn.Linear layers.
+TTS_INT8 = os.getenv("TTS_INT8", "false").lower() == "true"
+
+# torch + Coqui (librosa, ...) are only imported when Coqui is enabled, so a
+# web-only process (USE_COQUI_TTS=false) starts fast and stays small
+if USE_COQUI_TTS:
+    # Keep OpenMP threads on neighbouring cores (must be set before torch loads)
+    os.environ.setdefault("OMP_PROC_BIND", "close")
+    # Ask NVML instead of initializing the CUDA driver, which would poison
+    # CUDA in workers forked by gunicorn --preload
+    os.environ.setdefault("PYTORCH_NVML_BASED_CUDA_CHECK", "1")
+    import torch
+    from TTS.api import TTS
+    from TTS.tts.utils.synthesis import trim_silence
+
+    TTS_DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+
+_tts_ready_pid = None
+_tts_ready_lock = threading.RLock()
+
+
+def _usable_cpus() -> int:
+    # CPUs this process may run on (respects taskset / container cpusets)
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _quantize_torch_int8() -> None:
+    """
+    Dynamic int8 quantization of the model's nn.Linear layers (VNNI int8
+    GEMM on recent CPUs). quantize_dynamic skips convolutions, which is
+    most of VITS, so say plainly when there is nothing to quantize.
+    """
+    model = bn_tts.synthesizer.tts_model
+    n_linear = sum(isinstance(m, torch.nn.Linear) for m in model.modules())
+    if not n_linear:
+        print(
+            "⚠️ TTS_INT8=true but the model has no nn.Linear layers; "
+            "skipping int8 (use TTS_BACKEND=onnx to quantize convolutions)"
+        )
+        return
+    print(f"🧮 Quantizing {n_linear} VITS Linear layers to int8...")
+    torch.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+
+
+def warm_up_tts() -> None:
+    """
+    Put the model on TTS_DEVICE and run one throwaway synthesis, so the
+    first caller doesn't pay weight upload / cudnn autotune.
+    Runs once per serving process, never in the gunicorn --preload master:
+    CUDA and OpenMP thread pools don't survive fork, so the master only
+    holds the CPU weights the workers share.
+    """
+    global _tts_ready_pid
+    with _tts_ready_lock:
+        if bn_tts is None or _tts_ready_pid == os.getpid():
+            return
+        _tts_ready_pid = os.getpid()
+        if TTS_DEVICE == "cpu":
+            torch.set_num_threads(_usable_cpus())
+        if TTS_BACKEND == "torch":
+            bn_tts.to(TTS_DEVICE)  # the ONNX backend stays on CPU
+            if TTS_INT8 and TTS_DEVICE == "cpu":
+                _quantize_torch_int8()
+        synthesize_one("ওয়ার্মআপ")
+
+
+def coqui_inference():
+    """
+    Context for every Coqui call: no autograd bookkeeping, and FP16
+    autocast on CUDA so the VITS convolutions run on tensor cores.
+    """
+    stack = contextlib.ExitStack()
+    warm_up_tts()  # no-op once this process is set up
+    stack.enter_context(torch.inference_mode())
+    if TTS_DEVICE == "cuda":
+        stack.enter_context(torch.autocast(device_type="cuda", dtype=torch.float16))
+    return stack
+
+
 bn_tts = None
 if USE_COQUI_TTS:
-    print("🔊 Loading Coqui Bangla TTS model (vits-female)...")
+    print(f"🔊 Loading Coqui Bangla TTS model (vits-female) for {TTS_DEVICE}...")
     bn_tts = TTS(BN_MODEL_NAME)
+
 else:
     print("🎤 Using gTTS (Coqui disabled or Railway environment)")
 
 
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON via orjson (C, writes UTF-8 directly): used by jsonify(),
+    request.get_json() and the |tojson template filter.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2  # e.g. |tojson(indent=2)
+        return orjson.dumps(obj, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+            mimetype="application/json",
+        )
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "dev_secret")
 
 
@@ -51,7 +183,44 @@ app.secret_key = os.getenv("FLASK_SECRET_KEY", "dev_secret")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 LLAMA_MODEL = "llama-3.1-8b-instant"
 
-groq_client = Groq(api_key=GROQ_API_KEY)
+# One long-lived HTTP/2 connection pool, so per-turn LLM calls skip TLS setup
+groq_client = Groq(
+    api_key=GROQ_API_KEY,
+    http_client=httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=300.0),
+    ),
+)
+
+
+def warm_groq_connection() -> None:
+    """
+    Open the Groq connection in the background before the first user turn.
+    Called per process (the pool mustn't be shared across fork).
+    """
+    def ping():
+        try:
+            groq_client.models.list()
+        except Exception as e:
+            print("Groq warm-up error:", repr(e))
+
+    threading.Thread(target=ping, daemon=True).start()
+
+# Semantic reply cache for /api/local_bot (paraphrases reuse a past reply).
+# Scoped to one browser conversation: replies read back order details, so
+# they must never be served to another caller.
+# Needs sentence-transformers; enable with USE_SEMANTIC_CACHE=true in .env
+USE_SEMANTIC_CACHE = os.getenv("USE_SEMANTIC_CACHE", "false").lower() == "true"
+SEMANTIC_CACHE_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+SEMANTIC_CACHE_SIZE = 1000
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+semantic_embedder = None
+if USE_SEMANTIC_CACHE:
+    from sentence_transformers import SentenceTransformer
+
+    print("🧠 Loading semantic cache embedder (MiniLM)...")
+    semantic_embedder = SentenceTransformer(SEMANTIC_CACHE_MODEL, device="cpu")
 
 # ---- Coqui Bangla TTS model (offline) ----
 os.environ["COQUI_TOS_AGREED"] = "1"   # Required for Coqui models
@@ -77,14 +246,45 @@ signalwire_client = SignalWireClient(
 
 BASE_URL = os.getenv("BASE_URL", "http://localhost:5000")
 
-# In-memory storage (replace with DB later if you want)
+# In-memory storage (replace with DB later if you want).
+# Id allocation and writes go through orders_lock, so the dict stays in id
+# order (the dashboard pages through it newest first).
 orders = {}
-NEXT_ORDER_ID = 1
+orders_lock = threading.Lock()
+_order_id_gen = itertools.count(1)
+
+# Orders shown per page on the dashboard
+ORDERS_PER_PAGE = 50
 
 
 # -------------------------------------------------
 # Helpers: normalize phone, call LLaMA, scripts
 # -------------------------------------------------
+class _DigitsOnly(dict):
+    """
+    str.translate table keeping only digits (Bangla digits become ASCII);
+    every other character is deleted. Misses aren't stored: the input is
+    user text, so the table would grow with every new character seen.
+    """
+
+    def __missing__(self, codepoint):
+        return None
+
+
+_PHONE_DIGITS = _DigitsOnly(
+    {ord(c): c for c in "0123456789"}
+    | {ord(bn): en for bn, en in zip("০১২৩৪৫৬৭৮৯", "0123456789")}
+)
+
+# digit count -> (required prefix, what to put in front)
+_PHONE_RULES = {
+    13: ("880", "+"),     # already has country code: '88017...' -> '+88017...'
+    11: ("0", "+88"),     # local mobile, e.g. 017xxxxxxxx -> '+88017...'
+    10: ("1", "+880"),    # without leading 0, e.g. 1712345678 -> '+880171...'
+}
+
+
+@functools.lru_cache(maxsize=1024)
 def normalize_phone_bd(raw: str) -> str | None:
     """
     Normalize Bangladesh numbers into E.164 for SignalWire.
@@ -97,19 +297,11 @@ def normalize_phone_bd(raw: str) -> str | None:
     if not raw:
         return None
 
-    digits = re.sub(r"\D", "", raw)
-
-    # Already has country code 880
-    if digits.startswith("880") and len(digits) == 13:
-        return "+" + digits           # '88017...' -> '+88017...'
+    digits = raw.translate(_PHONE_DIGITS)
 
-    # Local 11-digit mobile starting with 0, e.g. 017xxxxxxxx
-    if digits.startswith("0") and len(digits) == 11:
-        return "+88" + digits         # '017...' -> '+88017...'
-
-    # 10-digit without leading 0, e.g. 1712345678
-    if digits.startswith("1") and len(digits) == 10:
-        return "+880" + digits        # '171...' -> '+880171...'
+    rule = _PHONE_RULES.get(len(digits))
+    if rule and digits.startswith(rule[0]):
+        return rule[1] + digits
 
     # If original had a '+' and enough digits, keep it
     if raw.strip().startswith("+") and len(digits) >= 11:
@@ -119,22 +311,12 @@ def normalize_phone_bd(raw: str) -> str | None:
 
 
 
-def parse_order_with_llama(order_text: str) -> dict:
-    """
-    Ask LLaMA (via Groq) to parse a free-form Bangla/English order
-    into structured JSON.
-    """
-    system_prompt = (
-        "You are an assistant that extracts structured order data "
-        "from free-text Bangla or English messages about shirt orders. "
-        "Always respond with valid JSON ONLY, no explanation."
-    )
-
-    user_prompt = f"""
-Customer message (Bangla / English mixed):
-
-\"\"\"{order_text}\"\"\"
-
+# Static prompts live at module level so every request sends the exact same
+# prefix (lets Groq reuse its prompt cache); dynamic text always goes last.
+ORDER_PARSE_SYSTEM_PROMPT = """
+You are an assistant that extracts structured order data
+from free-text Bangla or English messages about shirt orders.
+Always respond with valid JSON ONLY, no explanation.
 
 Important:
 - The customer is from Bangladesh.
@@ -142,8 +324,6 @@ Important:
 - Always try to extract a phone number if there are 10–14 digits that look like a Bangladeshi mobile.
 - Return the phone number as a string in whatever format appears (e.g. "01712345678" or "+8801712345678").
 
-
-
 Extract:
 - customer_name (if present)
 - quantity (number of shirts)
@@ -159,10 +339,32 @@ customer_name, quantity, color, size, price_total, phone, address, other_notes.
 If something not found, use null.
 """
 
+
+class _UnparsedOrder(ValueError):
+    """LLaMA answered with something other than a JSON object."""
+
+    def __init__(self, raw: str):
+        super().__init__("order parse is not a JSON object")
+        self.raw = raw
+
+
+@functools.lru_cache(maxsize=512)
+def _llama_parse_order_cached(order_text: str) -> dict:
+    """
+    Decoded LLaMA parse of an order message.
+    Cached so pasting the same message twice skips the API call; a bad
+    answer raises _UnparsedOrder instead, which lru_cache doesn't keep,
+    so pasting again re-queries.
+    """
+    user_prompt = f"""Customer message (Bangla / English mixed):
+
+\"\"\"{order_text}\"\"\"
+"""
+
     chat = groq_client.chat.completions.create(
         model=LLAMA_MODEL,
         messages=[
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": ORDER_PARSE_SYSTEM_PROMPT},
             {"role": "user", "content": user_prompt},
         ],
         temperature=0.2,
@@ -171,9 +373,24 @@ If something not found, use null.
 
     raw = chat.choices[0].message.content
     try:
-        data = json.loads(raw)
-    except json.JSONDecodeError:
-        data = {
+        data = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        raise _UnparsedOrder(raw) from None
+    if not isinstance(data, dict):
+        raise _UnparsedOrder(raw)
+    return data
+
+
+def parse_order_with_llama(order_text: str) -> dict:
+    """
+    Ask LLaMA (via Groq) to parse a free-form Bangla/English order
+    into structured JSON.
+    """
+    try:
+        # Copy so callers can modify it without touching the cache
+        return dict(_llama_parse_order_cached(order_text))
+    except _UnparsedOrder as e:
+        return {
             "customer_name": None,
             "quantity": None,
             "color": None,
@@ -181,11 +398,9 @@ If something not found, use null.
             "price_total": None,
             "phone": None,
             "address": None,
-            "other_notes": raw,
+            "other_notes": e.raw,
         }
 
-    return data
-
 
 def build_bangla_script(parsed: dict) -> str:
     """
@@ -242,6 +457,18 @@ def build_bangla_script(parsed: dict) -> str:
 
 
 
+# Common Bangla/English confirm / cancel patterns
+CONFIRM_PHRASES = ("হ্যাঁ", "ঠিক আছে", "কনফার্ম", "confirm", "হ্যা")
+CANCEL_PHRASES = ("না", "ক্যান্সেল", "cancel", "চাই না", "বাতিল")
+
+# One Aho-Corasick automaton finds every phrase in a single pass over the text
+_reply_automaton = ahocorasick.Automaton()
+for _phrase in CONFIRM_PHRASES + CANCEL_PHRASES:
+    _reply_automaton.add_word(_phrase, _phrase)
+_reply_automaton.make_automaton()
+
+
+@functools.lru_cache(maxsize=4096)
 def classify_customer_reply(text: str) -> str:
     """
     Very simple Bangla classification without LLM:
@@ -251,33 +478,15 @@ def classify_customer_reply(text: str) -> str:
         return "unclear"
 
     t = text.lower()
+    hits = {phrase for _, phrase in _reply_automaton.iter(t)}
 
-    # Common Bangla/English confirm patterns
-    if any(
-        phrase in t
-        for phrase in [
-            "হ্যাঁ",
-            "ঠিক আছে",
-            "কনফার্ম",
-            "confirm",
-            "হ্যা",
-        ]
-    ):
+    if hits.intersection(CONFIRM_PHRASES):
         # avoid cases like "না, কনফার্ম না"
-        if "না" in t and "কনফার্ম" in t:
+        if "না" in hits and "কনফার্ম" in hits:
             return "cancelled"
         return "confirmed"
 
-    if any(
-        phrase in t
-        for phrase in [
-            "না",
-            "ক্যান্সেল",
-            "cancel",
-            "চাই না",
-            "বাতিল",
-        ]
-    ):
+    if hits.intersection(CANCEL_PHRASES):
         return "cancelled"
 
     return "unclear"
@@ -291,8 +500,6 @@ def classify_customer_reply(text: str) -> str:
 
 @app.route("/", methods=["GET", "POST"])
 def index():
-    global NEXT_ORDER_ID
-
     if request.method == "POST":
         raw_text = request.form.get("order_text", "").strip()
         phone_manual = request.form.get("phone_manual", "").strip()
@@ -307,26 +514,42 @@ def index():
         if phone_manual:
             parsed["phone"] = phone_manual
 
-        script = build_bangla_script(parsed)
-
-        order_id = NEXT_ORDER_ID
-
-        NEXT_ORDER_ID += 1
-
-        orders[order_id] = {
-            "id": order_id,
-            "raw_text": raw_text,
-            "parsed": parsed,
-            "script": script,
-            "status": "pending",
-            "created_at": datetime.utcnow(),
-            "last_call_sid": None,
-            "last_result": None,
-        }
+        # Normalize once here; call retries just read it back.
+        # LLaMA may return the phone as a number or list, so go via str.
+        raw_phone = parsed.get("phone")
+        parsed["phone_e164"] = normalize_phone_bd(str(raw_phone)) if raw_phone else None
+
+        # The call script is rebuilt from "parsed" when needed, not stored.
+        # The id is taken under the lock so insertion order matches id order.
+        with orders_lock:
+            order_id = next(_order_id_gen)
+            orders[order_id] = {
+                "id": order_id,
+                "raw_text": raw_text,
+                "parsed": parsed,
+                "status": "pending",
+                "created_at": datetime.utcnow(),
+                "last_call_sid": None,
+                "last_result": None,
+            }
 
         return redirect(url_for("order_detail", order_id=order_id))
 
-    return render_template("index.html", orders=list(orders.values()))
+    # Newest first, one page at a time (?offset=50 for older ones)
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    with orders_lock:
+        total = len(orders)
+        order_list = list(
+            itertools.islice(reversed(orders.values()), offset, offset + ORDERS_PER_PAGE)
+        )
+
+    return render_template(
+        "index.html",
+        orders=order_list,
+        offset=offset,
+        page_size=ORDERS_PER_PAGE,
+        has_more=offset + ORDERS_PER_PAGE < total,
+    )
 
 
 @app.route("/order/<int:order_id>")
@@ -335,7 +558,11 @@ def order_detail(order_id):
     if not order:
         flash("Order not found.", "error")
         return redirect(url_for("index"))
-    return render_template("order_detail.html", order=order)
+    return render_template(
+        "order_detail.html",
+        order=order,
+        script=build_bangla_script(order["parsed"]),
+    )
 
 
 # -------------------------------------------------
@@ -349,7 +576,7 @@ def start_call(order_id):
         return redirect(url_for("index"))
 
     raw_phone = order["parsed"].get("phone")
-    phone = normalize_phone_bd(raw_phone)
+    phone = order["parsed"].get("phone_e164")
 
     if not phone:
         flash(f"Invalid or missing phone number: {raw_phone}", "error")
@@ -390,7 +617,7 @@ def voice_entry(order_id):
         vr.hangup()
         return Response(str(vr), mimetype="text/xml")
 
-    script = order["script"]
+    script = build_bangla_script(order["parsed"])
 
     vr = VoiceResponse()
 
@@ -475,7 +702,32 @@ def local_interact(order_id):
     if not order:
         flash("Order not found.", "error")
         return redirect(url_for("index"))
-    return render_template("local_interact.html", order=order)
+    return render_template(
+        "local_interact.html",
+        order=order,
+        script=build_bangla_script(order["parsed"]),
+    )
+
+
+REPLY_CONFIRM = (
+    "ধন্যবাদ। আপনার অর্ডার কনফার্ম করা হয়েছে। "
+    "খুব শিগগিরই আমরা ডেলিভারি প্রসেস শুরু করব ইনশাআল্লাহ।"
+)
+REPLY_CANCEL = (
+    "আপনার অর্ডার বাতিল করা হয়েছে। "
+    "ধন্যবাদ আমাদেরকে জানানোর জন্য। ভবিষ্যতে আবার আমাদের সাথে থাকবেন।"
+)
+REPLY_UNCLEAR = (
+    "দুঃখিত, আপনার উত্তরটি পরিষ্কারভাবে বোঝা যায়নি। "
+    "যদি কনফার্ম করতে চান, বলুন ‘হ্যাঁ, অর্ডার কনফার্ম’। "
+    "বাতিল করতে চাইলে বলুন ‘না, অর্ডার ক্যান্সেল’।"
+)
+
+INTERPRET_REPLIES = {
+    "confirmed": REPLY_CONFIRM,
+    "cancelled": REPLY_CANCEL,
+    "unclear": REPLY_UNCLEAR,
+}
 
 
 @app.route("/api/interpret", methods=["POST"])
@@ -488,22 +740,7 @@ def api_interpret():
     text = data.get("text", "") or ""
     decision = classify_customer_reply(text)
 
-    if decision == "confirmed":
-        reply = (
-            "ধন্যবাদ। আপনার অর্ডার কনফার্ম করা হয়েছে। "
-            "খুব শিগগিরই আমরা ডেলিভারি প্রসেস শুরু করব ইনশাআল্লাহ।"
-        )
-    elif decision == "cancelled":
-        reply = (
-            "আপনার অর্ডার বাতিল করা হয়েছে। "
-            "ধন্যবাদ আমাদেরকে জানানোর জন্য। ভবিষ্যতে আবার আমাদের সাথে থাকবেন।"
-        )
-    else:
-        reply = (
-            "দুঃখিত, আপনার উত্তরটি পরিষ্কারভাবে বোঝা যায়নি। "
-            "যদি কনফার্ম করতে চান, বলুন ‘হ্যাঁ, অর্ডার কনফার্ম’। "
-            "বাতিল করতে চাইলে বলুন ‘না, অর্ডার ক্যান্সেল’।"
-        )
+    reply = INTERPRET_REPLIES[decision]
 
     return jsonify({"decision": decision, "reply": reply})
 
@@ -513,160 +750,502 @@ def local_bot():
     """
     Standalone local voice bot page (no SignalWire, no phone, no order).
     """
-    return render_template("local_bot.html")
+    # Streamed playback only works with Coqui (raw PCM); gTTS gives MP3 files
+    return render_template(
+        "local_bot.html",
+        stream_audio=USE_COQUI_TTS and bn_tts is not None,
+    )
+
+
 
 
 
+FILLERS = [
+    "আচ্ছা স্যার,",
+    "জি স্যার,",
+    "ঠিক আছে স্যার,",
+    "হুম স্যার,"
+]
+
+# Varied, not random: a pre-shuffled cycle and a turn counter avoid the
+# lock inside the random module on every reply
+_FILLER_CYCLE = itertools.cycle(random.sample(FILLERS * 8, len(FILLERS) * 8))
+_filler_turns = itertools.count()
 
 
 def humanize_reply(text: str) -> str:
     """
     Make the Bangla reply sound a bit more like a real call-center agent.
-    Adds light fillers and smoother pauses.
+    Adds light fillers (3 replies out of every 10).
     """
     if not text:
         return text
 
-    # Light fillers at the start (not always)
-    fillers = [
-        "আচ্ছা স্যার,",
-        "জি স্যার,",
-        "ঠিক আছে স্যার,",
-        "হুম স্যার,"
-    ]
-
-    stripped = text.strip()
-    if (random.random() < 0.3 and
-        not stripped.startswith(("স্যার", "আচ্ছা", "জি", "ঠিক আছে"))):
-        text = random.choice(fillers) + " " + stripped
-    else:
-        text = stripped
+    if (next(_filler_turns) % 10 < 3 and
+        not text.startswith(("স্যার", "আচ্ছা", "জি", "ঠিক আছে"))):
+        return next(_FILLER_CYCLE) + " " + text
+    return text
 
 
-    # Make sentence breaks less abrupt
-    text = text.replace("।  ", "। ")
-    text = text.replace("। তারপর", "... তারপর")
-    text = text.replace("। কিন্তু", "... কিন্তু")
+# Polite/emotional tone for common phrases + less abrupt sentence breaks,
+# all applied in one regex pass
+_POST_SUBS = {
+    "ঠিক আছে": "ঠিক আছে স্যার",
+    "বুঝেছি": "জি স্যার, বুঝেছি",
+    "ধন্যবাদ": "অনেক ধন্যবাদ স্যার",
+    "।  ": "। ",
+}
+# "। তারপর" / "।  তারপর" → "... তারপর" (same for কিন্তু)
+_POST_RE = re.compile(
+    r"।  ?(তারপর|কিন্তু)|" + "|".join(map(re.escape, _POST_SUBS))
+)
 
-    return text
 
+def _post_sub(match: re.Match) -> str:
+    if match.group(1):
+        return "... " + match.group(1)
+    return _POST_SUBS[match.group(0)]
 
-def emotional_touch(text: str) -> str:
-    """
-    Add some polite/emotional tone to common phrases.
-    """
-    replacements = {
-        "ঠিক আছে": "ঠিক আছে স্যার",
-        "বুঝেছি": "জি স্যার, বুঝেছি",
-        "ধন্যবাদ": "অনেক ধন্যবাদ স্যার",
-    }
-    for src, tgt in replacements.items():
-        text = text.replace(src, tgt)
-    return text
 
 # Map Bangla digits → English digits for conversion
 BENGALI_DIGIT_MAP = str.maketrans("০১২৩৪৫৬৭৮৯", "0123456789")
 
+# Match both English and Bangla digit sequences
+_NUM_RE = re.compile(r"[0-9০-৯]+")
+
+
+@functools.lru_cache(maxsize=2048)
+def _number_to_bangla_words(raw: str) -> str:
+    """
+    '১২০' / '120' → 'একশ কুড়ি'. Cached since the same prices recur.
+    """
+    from num2words import num2words
+
+    # Convert any Bangla digits to ASCII digits
+    ascii_digits = raw.translate(BENGALI_DIGIT_MAP)
+    try:
+        n = int(ascii_digits)
+    except ValueError:
+        return raw
+
+    try:
+        return num2words(n, lang="bn")
+    except Exception:
+        return raw  # fallback: keep original
+
+
 def normalize_numbers_for_bangla_tts(text: str) -> str:
     """
     Convert numeric sequences (120, ১২০, 1200) into Bangla words
     so TTS says 'একশ কুড়ি' instead of 'ওয়ান টু জিরো'.
     Only affects speech; original text reply stays unchanged.
     """
-    def repl(match):
-        raw = match.group(0)
-        # Convert any Bangla digits to ASCII digits
-        ascii_digits = raw.translate(BENGALI_DIGIT_MAP)
-        try:
-            n = int(ascii_digits)
-        except ValueError:
-            return raw
-
-        try:
-            words_bn = num2words(n, lang="bn")
-        except Exception:
-            return raw  # fallback: keep original
-
-        return words_bn
+    # Most replies have no digits at all
+    if not _NUM_RE.search(text):
+        return text
 
-    # Match both English and Bangla digit sequences
-    return re.sub(r"[0-9০-৯]+", repl, text)
+    return _NUM_RE.sub(lambda m: _number_to_bangla_words(m.group(0)), text)
 
 
 
 
-def postprocess_bot_text(text: str) -> str:
+def postprocess_bot_text(text: str, add_filler: bool = True) -> str:
     """
     Combine humanization + emotional tone + light cleanup.
     """
-    text = text.strip()
-    text = emotional_touch(text)
-    text = humanize_reply(text)
+    text = _POST_RE.sub(_post_sub, text.strip())
+    if add_filler:
+        text = humanize_reply(text)
     return text
 
-def synthesize_bangla_tts(text: str) -> str:
+TTS_DIR = os.path.join("static", "tts")
+
+TARGET_DBFS = -16.0
+FADE_IN_MS = 20
+FADE_OUT_MS = 50
+
+
+def normalize_and_fade(samples: np.ndarray, sr: int) -> np.ndarray:
     """
-    Generate Bangla speech for the given text and return the static URL.
-    - If USE_COQUI_TTS=true and bn_tts is loaded  → use Coqui VITS (WAV).
-    - Otherwise                               → use gTTS (MP3, lightweight).
+    Normalize 16-bit-scaled float samples to TARGET_DBFS and apply a linear
+    fade in/out. Done in one NumPy pass instead of pydub's per-chunk loops.
+    Returns int16 samples.
     """
-    # Light cleanup: keep your existing logic
-    cleaned = text
-    cleaned = cleaned.replace("। তারপর", ", তারপর")
-    cleaned = normalize_numbers_for_bangla_tts(cleaned)
+    samples = np.asarray(samples, dtype=np.float32)
 
-    # Ensure static/tts exists
-    tts_dir = os.path.join("static", "tts")
-    os.makedirs(tts_dir, exist_ok=True)
+    # RMS loudness in dBFS, same reference as pydub's AudioSegment.dBFS
+    rms = float(np.sqrt(np.mean(samples ** 2))) if samples.size else 0.0
+    if rms > 0:
+        current_dBFS = 20 * np.log10(rms / 32768)
+        samples = samples * 10 ** ((TARGET_DBFS - current_dBFS) / 20)
 
-    # Unique filename
-    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
+    n_in = min(len(samples), sr * FADE_IN_MS // 1000)
+    n_out = min(len(samples), sr * FADE_OUT_MS // 1000)
+    if n_in:
+        ramp = np.linspace(0.0, 1.0, n_in, endpoint=False)
+        samples[:n_in] *= ramp[:, None] if samples.ndim == 2 else ramp
+    if n_out:
+        ramp = np.linspace(1.0, 0.0, n_out, endpoint=False)
+        samples[-n_out:] *= ramp[:, None] if samples.ndim == 2 else ramp
+
+    np.clip(samples, -32768, 32767, out=samples)
+    return samples.astype(np.int16)
+
+
+# Split replies after "।", "?" or "!" so each sentence can be synthesized
+# and streamed on its own
+_SENTENCE_RE = re.compile(r"[^।?!]+[।?!]*")
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_RE.findall(text) if s.strip()]
 
-    if USE_COQUI_TTS and bn_tts is not None:
-        # ---------- Coqui path (local dev, heavy model) ----------
-        filename = f"tts_{ts}.wav"
-        filepath = os.path.join(tts_dir, filename)
 
-        # 1) Generate raw Bangla TTS with cleaned text
-        bn_tts.tts_to_file(text=cleaned, file_path=filepath)
+def wav_stream_header(sample_rate: int, channels: int = 1, bits: int = 16) -> bytes:
+    """
+    RIFF/WAVE header for a PCM stream whose length isn't known yet.
+    """
+    block_align = channels * bits // 8
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack(
+            "<IHHIIHH", 16, 1, channels, sample_rate,
+            sample_rate * block_align, block_align, bits,
+        )
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
+_onnx_pid = None
+
+
+def _ensure_onnx_session() -> None:
+    """
+    Export VITS to ONNX (once, on disk) and open an ONNX Runtime session
+    in this process; ORT's thread pools don't survive fork.
+    """
+    global _onnx_pid
+    with _tts_ready_lock:
+        if _onnx_pid == os.getpid():
+            return
+        model = bn_tts.synthesizer.tts_model
+        if not os.path.exists(TTS_ONNX_PATH):
+            print(f"📦 Exporting VITS to ONNX ({TTS_ONNX_PATH})...")
+            model.export_onnx(output_path=TTS_ONNX_PATH, verbose=False)
 
-        # 2) Normalize volume
-        audio = AudioSegment.from_file(filepath, format="wav")
-        target_dBFS = -16.0
-        change_in_dBFS = target_dBFS - audio.dBFS
-        normalized_audio = audio.apply_gain(change_in_dBFS)
+        onnx_path = TTS_ONNX_PATH
+        if TTS_INT8:
+            # Covers Conv (as ConvInteger) and MatMul, unlike torch's
+            # quantize_dynamic
+            onnx_path = os.path.splitext(TTS_ONNX_PATH)[0] + ".int8.onnx"
+            if not os.path.exists(onnx_path):
+                from onnxruntime.quantization import QuantType, quantize_dynamic
 
-        # 3) Soft fade in/out
-        normalized_audio = normalized_audio.fade_in(20).fade_out(50)
+                print(f"🧮 Quantizing ONNX model to int8 ({onnx_path})...")
+                quantize_dynamic(TTS_ONNX_PATH, onnx_path, weight_type=QuantType.QInt8)
 
-        # 4) Save back
-        normalized_audio.export(filepath, format="wav")
+        model.load_onnx(onnx_path, cuda=False)
+        _onnx_pid = os.getpid()
+
+
+# Concurrent Coqui requests arriving within this window share one forward pass
+TTS_BATCH_WINDOW_MS = int(os.getenv("TTS_BATCH_WINDOW_MS", "20"))
+TTS_MAX_BATCH = int(os.getenv("TTS_MAX_BATCH", "8"))
+
+# Silence Coqui's Synthesizer.tts appends after every sentence
+SENTENCE_GAP_SAMPLES = 10000
+
+
+def split_text_for_tts(text: str) -> list[str]:
+    """
+    Sentences exactly as Coqui's Synthesizer.tts splits them. Every backend
+    and batch size synthesizes these same units, so a text always gets the
+    same audio no matter what else was in the batch.
+    """
+    return [s for s in bn_tts.synthesizer.split_into_sentences(text) if s.strip()]
+
+
+def _infer_batch_torch(sentences: list[str]) -> list[np.ndarray]:
+    """
+    One padded VITS forward pass for several sentences; float waveforms.
+    """
+    model = bn_tts.synthesizer.tts_model
+    ids = [model.tokenizer.text_to_ids(t) for t in sentences]
+
+    # Enter first: the lazy warm-up may still move the model to the GPU
+    with coqui_inference():
+        device = next(model.parameters()).device
+        lengths = torch.tensor([len(i) for i in ids], device=device)
+        x = torch.zeros(len(ids), int(lengths.max()), dtype=torch.long, device=device)
+        for row, seq in enumerate(ids):
+            x[row, : len(seq)] = torch.tensor(seq, device=device)
+        outputs = model.inference(x, aux_input={"x_lengths": lengths})
+
+    # Cut each waveform back to its own length (decoder frames * hop)
+    audio = outputs["model_outputs"].float().cpu().numpy()
+    frames = outputs["y_mask"].sum(dim=(1, 2)).long().cpu().tolist()
+    hop = model.config.audio.hop_length
+    return [audio[row, 0, : frames[row] * hop] for row in range(len(sentences))]
+
+
+def _infer_sentences(sentences: list[str]) -> list[np.ndarray]:
+    """
+    Float waveform per sentence, via TTS_BACKEND (padded batches on torch).
+    """
+    if TTS_BACKEND == "onnx":
+        _ensure_onnx_session()
+        model = bn_tts.synthesizer.tts_model
+        wavs = []
+        for sentence in sentences:
+            ids = np.array([model.tokenizer.text_to_ids(sentence)], dtype=np.int64)
+            wav = model.inference_onnx(ids)
+            wavs.append(np.asarray(wav, dtype=np.float32).reshape(-1))
+        return wavs
+
+    wavs = []
+    for start in range(0, len(sentences), TTS_MAX_BATCH):
+        wavs += _infer_batch_torch(sentences[start : start + TTS_MAX_BATCH])
+    return wavs
+
+
+def _join_sentence_wavs(wavs: list[np.ndarray]) -> np.ndarray:
+    """
+    Same layout as Synthesizer.tts: optional silence trim, then a fixed
+    gap after each sentence.
+    """
+    synth = bn_tts.synthesizer
+    audio_config = synth.tts_config.audio
+    trim = "do_trim_silence" in audio_config and audio_config["do_trim_silence"]
+
+    gap = np.zeros(SENTENCE_GAP_SAMPLES, dtype=np.float32)
+    parts = []
+    for wav in wavs:
+        if trim:
+            wav = np.asarray(trim_silence(wav, synth.tts_model.ap), dtype=np.float32)
+        parts += [wav, gap]
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+
+def synthesize_texts(texts: list[str]) -> list[np.ndarray]:
+    """
+    Float waveforms for several texts; all their sentences are synthesized
+    together.
+    """
+    per_text = [split_text_for_tts(t) for t in texts]
+    wavs = iter(_infer_sentences([s for sentences in per_text for s in sentences]))
+    return [_join_sentence_wavs([next(wavs) for _ in sentences]) for sentences in per_text]
+
+
+def synthesize_one(text: str) -> np.ndarray:
+    return synthesize_texts([text])[0]
+
+
+class TTSBatcher:
+    """
+    Single background thread that owns the Coqui model. Requests waiting in
+    the queue (up to TTS_BATCH_WINDOW_MS after the first) are synthesized
+    together via synthesize_texts().
+    """
+
+    def __init__(self, window_ms: int, max_batch: int):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._reset()
+        # A forked child inherits the queue with the parent's (dead) worker
+        # thread still registered as a waiter; start clean instead
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def submit(self, text: str) -> Future:
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if not self._started:
+                self._started = True
+                threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                wavs = synthesize_texts([text for text, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                print("Batched TTS failed, falling back to one by one:", repr(e))
+            else:
+                for (_, future), wav in zip(batch, wavs):
+                    future.set_result(wav)
+                continue
+
+            for text, future in batch:
+                try:
+                    future.set_result(synthesize_one(text))
+                except Exception as e:
+                    future.set_exception(e)
+
+
+tts_batcher = TTSBatcher(TTS_BATCH_WINDOW_MS, TTS_MAX_BATCH)
+
+
+def synthesize_pcm16(cleaned: str) -> np.ndarray:
+    """
+    Coqui synthesis straight to normalized mono int16 samples (no file).
+    """
+    wav = tts_batcher.submit(cleaned).result()
+    samples = np.asarray(wav, dtype=np.float32) * 32767
+    return normalize_and_fade(samples, bn_tts.synthesizer.output_sample_rate)
+
+
+@functools.lru_cache(maxsize=1024)
+def _tts_filename(cleaned: str) -> str:
+    """
+    Content-addressed name: the same text always maps to the same file.
+    """
+    key = hashlib.sha1(cleaned.encode("utf-8")).hexdigest()[:16]
+    use_coqui = USE_COQUI_TTS and bn_tts is not None
+    return f"tts_{key}.wav" if use_coqui else f"tts_{key}.mp3"
+
+
+def _synthesize_tts_file(cleaned: str) -> str:
+    """
+    Synthesize already-cleaned text into static/tts and return the filename.
+    A phrase is only generated again after the sweeper has evicted it.
+    """
+    filename = _tts_filename(cleaned)
+    filepath = os.path.join(TTS_DIR, filename)
+
+    try:
+        os.utime(filepath, None)  # keep hot files alive for the sweeper
+        return filename
+    except FileNotFoundError:
+        pass
+
+    # Ensure static/tts exists
+    os.makedirs(TTS_DIR, exist_ok=True)
+
+    # Write to a temp file first so a half-written file is never served
+    tmp_path = f"{filepath}.{uuid.uuid4().hex}.tmp"
+
+    if USE_COQUI_TTS and bn_tts is not None:
+        # ---------- Coqui path (local dev, heavy model) ----------
+        # Synthesize to normalized int16 in memory, then a single write
+        sf.write(
+            tmp_path,
+            synthesize_pcm16(cleaned),
+            bn_tts.synthesizer.output_sample_rate,
+            format="WAV",
+            subtype="PCM_16",
+        )
 
     else:
         # ---------- gTTS path (Railway, lightweight) ----------
-        filename = f"tts_{ts}.mp3"
-        filepath = os.path.join(tts_dir, filename)
+        from gtts import gTTS
 
         # gTTS handles Bangla with lang="bn"
         tts = gTTS(cleaned, lang="bn")
-        tts.save(filepath)
+        tts.save(tmp_path)
+
+    os.replace(tmp_path, filepath)
+    return filename
+
+
+# Evict cached audio not used for a day; check every 10 minutes
+TTS_CACHE_MAX_AGE = 24 * 60 * 60
+TTS_SWEEP_INTERVAL = 10 * 60
+
+
+def sweep_tts_cache() -> None:
+    """
+    Remove files in static/tts not accessed within TTS_CACHE_MAX_AGE,
+    then schedule the next sweep.
+    """
+    cutoff = time.time() - TTS_CACHE_MAX_AGE
+    try:
+        for entry in os.scandir(TTS_DIR):
+            try:
+                if entry.is_file() and os.path.getatime(entry.path) < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+    except FileNotFoundError:
+        pass  # nothing generated yet
+    except Exception as e:
+        print("TTS cache sweep error:", repr(e))
+
+    timer = threading.Timer(TTS_SWEEP_INTERVAL, sweep_tts_cache)
+    timer.daemon = True
+    timer.start()
+
+
+def clean_text_for_tts(text: str) -> str:
+    """
+    Light cleanup applied before synthesis (also the TTS cache key).
+    """
+    cleaned = text
+    cleaned = cleaned.replace("। তারপর", ", তারপর")
+    cleaned = normalize_numbers_for_bangla_tts(cleaned)
+    return cleaned
+
+
+def synthesize_bangla_tts(text: str) -> str:
+    """
+    Generate Bangla speech for the given text and return the static URL.
+    - If USE_COQUI_TTS=true and bn_tts is loaded  → use Coqui VITS (WAV).
+    - Otherwise                               → use gTTS (MP3, lightweight).
+    Identical text is served from the on-disk cache without re-synthesizing.
+    """
+    filename = _synthesize_tts_file(clean_text_for_tts(text))
 
     # Return URL that frontend can play
     return url_for("static", filename=f"tts/{filename}")
 
 
+WELCOME_INTRO = (
+    "আসসালামু আলাইকুম। আমি একজন বট কথা বলছি। "
+    "আপনি একটি শার্ট অর্ডার করেছেন। "
+    "অনুগ্রহ করে শার্টের মডেল, রঙ আর সাইজ বলুন। "
+    "অর্ডার ঠিক থাকলে বলবেন – ‘হ্যাঁ, অর্ডার কনফার্ম’। "
+    "বাতিল করতে চাইলে বলবেন – ‘না, অর্ডার ক্যান্সেল’।"
+)
+
+
+def prewarm_tts_cache() -> None:
+    """
+    Synthesize fixed phrases at startup so the first caller doesn't wait.
+    """
+    for phrase in (WELCOME_INTRO,):
+        try:
+            _synthesize_tts_file(clean_text_for_tts(phrase))
+        except Exception as e:
+            print("TTS prewarm error:", repr(e))
+
+
 @app.route("/api/local_bot_welcome", methods=["GET"])
 def api_local_bot_welcome():
     """
     First sentence from the bot when user clicks Start in Local Voice Bot.
     """
-    intro = (
-        "আসসালামু আলাইকুম। আমি একজন বট কথা বলছি। "
-        "আপনি একটি শার্ট অর্ডার করেছেন। "
-        "অনুগ্রহ করে শার্টের মডেল, রঙ আর সাইজ বলুন। "
-        "অর্ডার ঠিক থাকলে বলবেন – ‘হ্যাঁ, অর্ডার কনফার্ম’। "
-        "বাতিল করতে চাইলে বলবেন – ‘না, অর্ডার ক্যান্সেল’।"
-    )
+    intro = WELCOME_INTRO
 
     try:
         audio_url = synthesize_bangla_tts(intro)
@@ -682,32 +1261,63 @@ def api_local_bot_welcome():
 
 
 
-@app.route("/api/local_bot", methods=["POST"])
-def api_local_bot():
+# (embedding, conversation id + history hash, cached reply) for the last N turns
+_semantic_cache = deque(maxlen=SEMANTIC_CACHE_SIZE)
+_semantic_cache_lock = threading.Lock()
+
+
+def semantic_cache_lookup(context: str, text: str):
     """
-    Browser sends full conversation; we call LLaMA to generate the next reply,
-    then synthesize Bangla audio using local Coqui Bangla TTS.
+    Return (cached_reply or None, embedding of text).
+    Only entries from the same conversation at the same point are
+    considered (see semantic_cache_key); an empty context disables the cache.
+    Messages with numbers (quantity, size, phone, price) are never cached:
+    "৩টা শার্ট" and "৫টা শার্ট" embed almost identically.
     """
-    data = request.get_json(force=True)
-    messages = data.get("messages", [])
-
-    if not isinstance(messages, list):
-        return jsonify({"error": "messages must be a list"}), 400
+    if semantic_embedder is None or not context or not text or _NUM_RE.search(text):
+        return None, None
+
+    emb = semantic_embedder.encode(text, normalize_embeddings=True)
+
+    with _semantic_cache_lock:
+        entries = [e for e in _semantic_cache if e[1] == context]
+    if not entries:
+        return None, emb
+
+    # Embeddings are normalized, so the dot product is cosine similarity
+    sims = np.stack([e[0] for e in entries]) @ emb
+    best = int(np.argmax(sims))
+    if sims[best] > SEMANTIC_CACHE_THRESHOLD:
+        return entries[best][2], emb
+    return None, emb
+
+
+def semantic_cache_store(context: str, emb, reply: str) -> None:
+    if emb is None or not reply:
+        return
+    with _semantic_cache_lock:
+        _semantic_cache.append((emb, context, reply))
+
+
+LOCAL_BOT_SYSTEM_PROMPT = (
+    "তুমি একজন বাংলাদেশের কল সেন্টার এজেন্ট, কাজ শুধু শার্ট অর্ডার কনফার্ম করা। "
+    "সব সময় শুধু বাংলা ভাষায় কথা বলবে। "
+    "তুমি শুধু এই বিষয়গুলো নিয়ে কথা বলতে পারো: শার্টের সংখ্যা, কালার, সাইজ, দাম, "
+    "কাস্টমারের নাম, মোবাইল নাম্বার, ডেলিভারি অ্যাড্রেস, অর্ডার কনফার্ম/ক্যান্সেল। "
+    "এর বাইরে কোনো টপিক, সাধারণ কথা, পরামর্শ, মজার কথা, জ্ঞানগর্ভ কথা কিছুই বলবে না। "
+    "যদি ইউজার অন্য কিছু জিজ্ঞেস করে বা অন্য বিষয়ে চলে যায়, তুমি সংক্ষিপ্তভাবে এভাবে বলবে: "
+    "“স্যার, আমি শুধু আপনার শার্ট অর্ডার কনফার্ম করার জন্য আছি, "
+    "অনুগ্রহ করে অর্ডারের তথ্য বলুন।” "
+    "একবার উত্তরে সর্বোচ্চ ১–২টি ছোট বাক্য ব্যবহার করবে, "
+    "ভদ্র, পরিষ্কার এবং সহজ ভাষায় কথা বলবে। "
+)
 
-    system_prompt = (
-        "তুমি একজন বাংলাদেশের কল সেন্টার এজেন্ট, কাজ শুধু শার্ট অর্ডার কনফার্ম করা। "
-        "সব সময় শুধু বাংলা ভাষায় কথা বলবে। "
-        "তুমি শুধু এই বিষয়গুলো নিয়ে কথা বলতে পারো: শার্টের সংখ্যা, কালার, সাইজ, দাম, "
-        "কাস্টমারের নাম, মোবাইল নাম্বার, ডেলিভারি অ্যাড্রেস, অর্ডার কনফার্ম/ক্যান্সেল। "
-        "এর বাইরে কোনো টপিক, সাধারণ কথা, পরামর্শ, মজার কথা, জ্ঞানগর্ভ কথা কিছুই বলবে না। "
-        "যদি ইউজার অন্য কিছু জিজ্ঞেস করে বা অন্য বিষয়ে চলে যায়, তুমি সংক্ষিপ্তভাবে এভাবে বলবে: "
-        "“স্যার, আমি শুধু আপনার শার্ট অর্ডার কনফার্ম করার জন্য আছি, "
-        "অনুগ্রহ করে অর্ডারের তথ্য বলুন।” "
-        "একবার উত্তরে সর্বোচ্চ ১–২টি ছোট বাক্য ব্যবহার করবে, "
-        "ভদ্র, পরিষ্কার এবং সহজ ভাষায় কথা বলবে। "
-    )
 
-    groq_messages = [{"role": "system", "content": system_prompt}]
+def build_groq_messages(messages: list) -> list:
+    """
+    System prompt first, then the browser's conversation history.
+    """
+    groq_messages = [{"role": "system", "content": LOCAL_BOT_SYSTEM_PROMPT}]
     for m in messages:
         role = m.get("role", "user")
         content = m.get("content", "")
@@ -716,17 +1326,68 @@ def api_local_bot():
         if role not in {"user", "assistant"}:
             role = "user"
         groq_messages.append({"role": role, "content": content})
+    return groq_messages
+
+
+def semantic_cache_key(conversation_id, groq_messages: list) -> tuple[str, str]:
+    """
+    (hash of the page's conversation id and the whole conversation before
+    the last user message, that message) — the semantic cache key.
+    Every call starts with the same welcome, so the history alone doesn't
+    tell callers apart. Empty if the page sent no id or the last turn
+    isn't the user's.
+    """
+    if (
+        not isinstance(conversation_id, str)
+        or not conversation_id
+        or len(groq_messages) < 2
+        or groq_messages[-1]["role"] != "user"
+    ):
+        return "", ""
+    context = hashlib.sha1(
+        orjson.dumps([conversation_id, groq_messages[:-1]])
+    ).hexdigest()
+    return context, groq_messages[-1]["content"]
+
+
+def generate_bot_reply(groq_messages: list, conversation_id=None) -> str:
+    """
+    Next Bangla reply from LLaMA (or the semantic cache), post-processed.
+    """
+    # Paraphrase of something already answered at this point of the call?
+    context, last_user = semantic_cache_key(conversation_id, groq_messages)
+    cached_reply, emb = semantic_cache_lookup(context, last_user)
+    if cached_reply is not None:
+        return cached_reply
+
+    chat = groq_client.chat.completions.create(
+        model=LLAMA_MODEL,
+        messages=groq_messages,
+        temperature=0.2,
+    )
+    reply = chat.choices[0].message.content
+    reply = postprocess_bot_text(reply)
+    semantic_cache_store(context, emb, reply)
+    return reply
+
+
+@app.route("/api/local_bot", methods=["POST"])
+def api_local_bot():
+    """
+    Browser sends full conversation; we call LLaMA to generate the next reply,
+    then synthesize Bangla audio using local Coqui Bangla TTS.
+    """
+    data = request.get_json(force=True)
+    messages = data.get("messages", [])
+
+    if not isinstance(messages, list):
+        return jsonify({"error": "messages must be a list"}), 400
 
     # 1) Get Bangla reply text from LLaMA
     try:
-        chat = groq_client.chat.completions.create(
-            model=LLAMA_MODEL,
-            messages=groq_messages,
-            temperature=0.2,
+        reply = generate_bot_reply(
+            build_groq_messages(messages), data.get("conversation_id")
         )
-        reply = chat.choices[0].message.content
-        reply = postprocess_bot_text(reply)
-
     except Exception as e:
         print("Groq error in /api_local_bot:", repr(e))
         return jsonify({
@@ -749,9 +1410,178 @@ def api_local_bot():
     return jsonify({"reply": reply, "audio_url": audio_url})
 
 
+_SENTENCE_END_RE = re.compile(r"[।?!]+")
+
+# "। তারপর" / "। কিন্তু" are rewritten across the "।" by postprocess_bot_text
+# and clean_text_for_tts, so the stream must not be cut there
+_JOINED_WORDS = ("তারপর", "কিন্তু")
+
+
+def _next_sentence_cut(buffer: str) -> int | None:
+    """
+    End index of the first complete sentence in buffer, or None if there
+    isn't one yet (or it's still unclear whether more punctuation, like the
+    second "?" of "??", or তারপর/কিন্তু follows).
+    """
+    for m in _SENTENCE_END_RE.finditer(buffer):
+        if m.end() == len(buffer):
+            return None  # need more text to decide
+        if not m.group(0).endswith("।"):
+            return m.end()
+        rest = buffer[m.end():].lstrip(" ")
+        if rest.startswith(_JOINED_WORDS):
+            continue  # stays in the same sentence
+        if any(word.startswith(rest) for word in _JOINED_WORDS):
+            return None  # need more text to decide
+        return m.end()
+    return None
+
+
+def stream_bot_reply_sentences(groq_messages: list, conversation_id=None):
+    """
+    Like generate_bot_reply(), but yields post-processed sentences as soon as
+    LLaMA has streamed each one, so TTS can start before the reply is done.
+    """
+    context, last_user = semantic_cache_key(conversation_id, groq_messages)
+    cached_reply, emb = semantic_cache_lookup(context, last_user)
+    if cached_reply is not None:
+        yield from split_sentences(cached_reply)
+        return
+
+    stream = groq_client.chat.completions.create(
+        model=LLAMA_MODEL,
+        messages=groq_messages,
+        temperature=0.2,
+        stream=True,
+    )
+
+    def finish(sentence: str, first: bool) -> str:
+        # Fillers only make sense at the start of the reply
+        return postprocess_bot_text(sentence, add_filler=first)
+
+    sentences = []
+    buffer = ""
+    for chunk in stream:
+        buffer += chunk.choices[0].delta.content or ""
+        while (cut := _next_sentence_cut(buffer)) is not None:
+            sentence, buffer = buffer[:cut], buffer[cut:]
+            if sentence.strip():
+                sentences.append(finish(sentence, not sentences))
+                yield sentences[-1]
+    if buffer.strip():
+        sentences.append(finish(buffer, not sentences))
+        yield sentences[-1]
+
+    semantic_cache_store(context, emb, " ".join(sentences))
+
+
+# Full reply text of recent streamed turns, fetched by the page afterwards
+STREAM_REPLIES_MAX = 256
+_stream_replies = OrderedDict()
+_stream_replies_lock = threading.Lock()
+
+
+@app.route("/api/local_bot_stream", methods=["POST"])
+def api_local_bot_stream():
+    """
+    Same as /api/local_bot, but pipelined and streamed (Coqui only):
+    LLaMA streams the reply in a background thread, each finished sentence
+    is synthesized right away and its PCM is sent as part of one WAV
+    response, so playback starts after the first sentence.
+    The full reply text is available from
+    /api/local_bot_stream/<X-Turn-Id header>/reply once the audio ends.
+    """
+    if not (USE_COQUI_TTS and bn_tts is not None):
+        return jsonify({"error": "Streaming needs Coqui TTS (USE_COQUI_TTS=true)"}), 400
+
+    data = request.get_json(force=True)
+    messages = data.get("messages", [])
+
+    if not isinstance(messages, list):
+        return jsonify({"error": "messages must be a list"}), 400
+
+    groq_messages = build_groq_messages(messages)
+    conversation_id = data.get("conversation_id")
+    turn_id = uuid.uuid4().hex
+    sentences = queue.Queue()
+
+    def produce():
+        parts = []
+        try:
+            for sentence in stream_bot_reply_sentences(groq_messages, conversation_id):
+                parts.append(sentence)
+                sentences.put(sentence)
+        except Exception as e:
+            sentences.put(e)
+        with _stream_replies_lock:
+            _stream_replies[turn_id] = " ".join(parts)
+            while len(_stream_replies) > STREAM_REPLIES_MAX:
+                _stream_replies.popitem(last=False)
+        sentences.put(None)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    # Wait for the first sentence so LLM errors still get a proper 500
+    first = sentences.get()
+    if isinstance(first, Exception):
+        print("Groq error in /api/local_bot_stream:", repr(first))
+        return jsonify({"reply": "", "error": f"Groq error: {first}"}), 500
+
+    sample_rate = bn_tts.synthesizer.output_sample_rate
+
+    def generate():
+        yield wav_stream_header(sample_rate)
+        item = first
+        while item is not None:
+            if isinstance(item, Exception):
+                print("Groq error in /api/local_bot_stream:", repr(item))
+            else:
+                try:
+                    yield synthesize_pcm16(clean_text_for_tts(item)).tobytes()
+                except Exception as e:
+                    # Headers are already sent; the client just sees the audio end
+                    print("Coqui Bangla TTS stream error:", repr(e))
+            item = sentences.get()
+
+    return Response(
+        generate(),
+        mimetype="audio/wav",
+        headers={"X-Turn-Id": turn_id, "Cache-Control": "no-store"},
+    )
+
+
+@app.route("/api/local_bot_stream/<turn_id>/reply", methods=["GET"])
+def api_local_bot_stream_reply(turn_id):
+    """
+    Full reply text of a streamed turn (for the log and conversation history).
+    """
+    with _stream_replies_lock:
+        reply = _stream_replies.get(turn_id)
+    if reply is None:
+        return jsonify({"error": "unknown turn"}), 404
+    return jsonify({"reply": reply})
+
+
+
+def init_worker() -> None:
+    """
+    Per-process startup: model warm-up, phrase cache, cache sweeper and the
+    Groq connection. Called from gunicorn's post_worker_init and before
+    app.run(); never at import, since with --preload that would start
+    CUDA / OpenMP / timer threads in the master before it forks.
+    """
+    # Only worth it for the heavy Coqui model; gTTS is fast enough on demand
+    if USE_COQUI_TTS and bn_tts is not None:
+        warm_up_tts()
+        prewarm_tts_cache()
+    sweep_tts_cache()
+    warm_groq_connection()
+
 
 # -------------------------------------------------
 # Run
 # -------------------------------------------------
+# Local dev only; production runs gunicorn against wsgi:app (see Procfile)
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    init_worker()
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1", host="0.0.0.0", port=5000)
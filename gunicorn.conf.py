@@ -0,0 +1,10 @@
+# Picked up automatically by gunicorn from the working directory.
+
+
+def post_worker_init(worker):
+    # With --preload the master only imports the app; everything that
+    # doesn't survive fork (CUDA, OpenMP threads, timers, the Groq
+    # connection pool) is set up here, in each worker.
+    from app import init_worker
+
+    init_worker()
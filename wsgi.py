@@ -0,0 +1,2 @@
+# Gunicorn entry point: gunicorn --preload ... wsgi:app
+from app import app